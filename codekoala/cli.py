@@ -1,3 +1,5 @@
+import logging
+
 import click
 from typing import Optional
 from rich.console import Console
@@ -18,9 +20,15 @@ from codekoala.config import set_config, load_config
 
 
 @click.group()
-def cli():
+@click.option("-v", "--verbose", is_flag=True, help="Report prompt size and prompt eval timings from Ollama.")
+def cli(verbose: bool):
     """CodeKoala CLI - LLM-powered code review."""
-    pass
+    if verbose:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        codekoala_logger = logging.getLogger("codekoala")
+        codekoala_logger.addHandler(handler)
+        codekoala_logger.setLevel(logging.INFO)
 
 
 @click.command()
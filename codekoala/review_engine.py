@@ -1,4 +1,5 @@
 import json
+import logging
 import re
 from typing import Any, Dict, List, Optional
 from ollama import chat, ChatResponse
@@ -9,46 +10,50 @@ from codekoala.git_integration import FileChange
 MAX_REVIEW_PROMPT_CHARS = 24000
 MAX_REVIEW_DIFF_SECTION_CHARS = 8000
 MAX_REVIEW_OLD_CONTENT_CHARS = 4000
+MAX_REVIEW_OLD_CONTENT_TOTAL_CHARS = 8000
 MAX_COMMIT_PROMPT_CHARS = 12000
 MAX_COMMIT_DIFF_SECTION_CHARS = 4000
 MAX_USER_CONTEXT_CHARS = 2000
 TRUNCATION_NOTICE_TEMPLATE = (
     "\n\n[Truncated {omitted} characters from {label} to stay within limits.]"
 )
+# Code and diffs tokenise densely, so err on the side of fewer characters per token.
+CHARS_PER_TOKEN_ESTIMATE = 3
+RESPONSE_TOKEN_RESERVE = 1024
+# Fixed buckets keep num_ctx stable between calls so Ollama does not reload the model.
+NUM_CTX_BUCKETS = (4096, 8192, 16384, 32768)
+
+REVIEW_SYSTEM_PROMPT = (
+    "You are a code review assistant. You will receive Git diffs. "
+    "Review the changes and provide structured feedback in the exact format below.\n\n"
+    "**Evaluation Criteria:**\n"
+    "- Best programming practices\n"
+    "- SOLID principles\n"
+    "- Design patterns\n"
+    "- Code readability and maintainability\n"
+    "- Efficiency and performance improvements\n"
+    "- Identifying and avoiding common code smells\n\n"
+    "[bold yellow]Issues/Bugs:[/bold yellow]\n"
+    "- <Issue description>\n"
+    "[bold cyan]Recommended Refactors:[/bold cyan]\n"
+    "- <Refactor description>\n"
+    "[bold green]Non-Essential Enhancements:[/bold green]\n"
+    "- <Enhancement description>\n\n"
+    "If no issues exist, state `[bold green]No issues found in this diff.[/bold green]`. "
+    "Always include the three sections even when empty."
+)
+
+logger = logging.getLogger(__name__)
 
 
 def get_local_llm_code_suggestions(changes: List[FileChange]) -> str:
     """Fetch code suggestions from the locally running CodeLlama model."""
     if not changes:
         return
-    response: ChatResponse = chat(
-        model=get_config_value("model"),
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a code review assistant. You will receive Git diffs. "
-                    "Review the changes and provide structured feedback in the exact format below.\n\n"
-                    "**Evaluation Criteria:**\n"
-                    "- Best programming practices\n"
-                    "- SOLID principles\n"
-                    "- Design patterns\n"
-                    "- Code readability and maintainability\n"
-                    "- Efficiency and performance improvements\n"
-                    "- Identifying and avoiding common code smells\n\n"
-                    "[bold yellow]Issues/Bugs:[/bold yellow]\n"
-                    "- <Issue description>\n"
-                    "[bold cyan]Recommended Refactors:[/bold cyan]\n"
-                    "- <Refactor description>\n"
-                    "[bold green]Non-Essential Enhancements:[/bold green]\n"
-                    "- <Enhancement description>\n\n"
-                    "If no issues exist, state `[bold green]No issues found in this diff.[/bold green]`. "
-                    "Always include the three sections even when empty."
-                ),
-            },
-            {"role": "user", "content": f"{_prepare_llm_review_prompt(changes)}"},
-        ],
-    )
+    response = _chat_with_context([
+        {"role": "system", "content": REVIEW_SYSTEM_PROMPT},
+        {"role": "user", "content": f"{_prepare_llm_review_prompt(changes)}"},
+    ])
 
     return response.message.content
 
@@ -67,7 +72,7 @@ def get_local_llm_commit_message(
         user_context=user_context,
         user_ticket=user_ticket,
     )
-    response: ChatResponse = chat(model=get_config_value("model"), messages=[
+    response = _chat_with_context([
         {"role": "system", "content": COMMIT_MESSAGE_SYSTEM_PROMPT},
         {"role": "user", "content": f"{user_prompt}"},
     ])
@@ -82,25 +87,34 @@ def _prepare_llm_review_prompt(changes: List[FileChange]) -> str:
     """Create prompt for LLM review."""
     prompt = "Please analyse these changes and review them based on the criteria outlined above:\n\n"
 
+    # Previous content is stable across re-runs, so it all goes ahead of the diffs
+    # and is capped on its own so the diffs are never what gets cut for it.
+    previous_section = ""
     for change in changes:
-        prompt += f"File: {change.path}\n"
-        prompt += f"Change Type: {change.change_type}\n"
-        diff_content = _truncate_section(
-            change.content,
-            MAX_REVIEW_DIFF_SECTION_CHARS,
-            f"diff for {change.path}"
-        )
-        prompt += f"Diff:\n{diff_content}\n"
         if change.old_content:
             previous_content = _truncate_section(
                 change.old_content,
                 MAX_REVIEW_OLD_CONTENT_CHARS,
                 f"previous content for {change.path}"
             )
-            prompt += f"Previous Content:\n{previous_content}\n"
-        prompt += "-" * 50 + "\n"
+            previous_section += f"File: {change.path}\n"
+            previous_section += f"Previous Content:\n{previous_content}\n"
+            previous_section += "-" * 50 + "\n"
+    prompt += _truncate_section(previous_section, MAX_REVIEW_OLD_CONTENT_TOTAL_CHARS, "previous content")
 
-    return _truncate_section(prompt, MAX_REVIEW_PROMPT_CHARS, "review prompt")
+    diff_section = ""
+    for change in changes:
+        diff_content = _truncate_section(
+            change.content,
+            MAX_REVIEW_DIFF_SECTION_CHARS,
+            f"diff for {change.path}"
+        )
+        diff_section += f"File: {change.path}\n"
+        diff_section += f"Change Type: {change.change_type}\n"
+        diff_section += f"Diff:\n{diff_content}\n"
+        diff_section += "-" * 50 + "\n"
+
+    return prompt + _truncate_section(diff_section, MAX_REVIEW_PROMPT_CHARS - len(prompt), "review diffs")
 
 
 def prepare_llm_commit_message_prompt(
@@ -138,6 +152,41 @@ def prepare_llm_commit_message_prompt(
     return _truncate_section(prompt, MAX_COMMIT_PROMPT_CHARS, "commit message prompt")
 
 
+def _chat_with_context(messages: List[Dict[str, str]]) -> ChatResponse:
+    """Call the model with a context window sized to fit the prompt."""
+    num_ctx = _estimate_num_ctx(messages)
+    response: ChatResponse = chat(
+        model=get_config_value("model"),
+        messages=messages,
+        options={"num_ctx": num_ctx},
+    )
+    _log_prompt_eval(response, num_ctx)
+    return response
+
+
+def _estimate_num_ctx(messages: List[Dict[str, str]]) -> int:
+    """Estimate the context window needed for the messages, rounded up to a bucket."""
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    required_tokens = -(-prompt_chars // CHARS_PER_TOKEN_ESTIMATE) + RESPONSE_TOKEN_RESERVE
+    for bucket in NUM_CTX_BUCKETS:
+        if required_tokens <= bucket:
+            return bucket
+    return NUM_CTX_BUCKETS[-1]
+
+
+def _log_prompt_eval(response: ChatResponse, num_ctx: int) -> None:
+    prompt_eval_count = getattr(response, "prompt_eval_count", None)
+    prompt_eval_duration = getattr(response, "prompt_eval_duration", None)
+    if prompt_eval_duration is None:
+        return
+    logger.info(
+        "Prompt eval: %s tokens in %.1f ms (num_ctx=%d)",
+        prompt_eval_count,
+        prompt_eval_duration / 1_000_000,
+        num_ctx,
+    )
+
+
 def _get_changed_section(diff_content: str) -> str:
     """Extract only the changed lines from the diff content."""
     lines = diff_content.splitlines()
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+import pytest
+
+from codekoala.git_integration import FileChange
+from codekoala.review_engine import (
+    MAX_REVIEW_PROMPT_CHARS,
+    _estimate_num_ctx,
+    _log_prompt_eval,
+    _prepare_llm_review_prompt,
+)
+
+
+def _messages(total_chars: int):
+    return [
+        {"role": "system", "content": "s" * (total_chars // 2)},
+        {"role": "user", "content": "u" * (total_chars - total_chars // 2)},
+    ]
+
+
+@pytest.mark.parametrize(
+    "total_chars, expected",
+    [
+        (0, 4096),
+        (3 * (4096 - 1024), 4096),
+        (3 * (4096 - 1024) + 1, 8192),
+        (3 * (32768 - 1024), 32768),
+        (10**6, 32768),
+    ],
+)
+def test_estimate_num_ctx_rounds_up_to_bucket(total_chars, expected):
+    assert _estimate_num_ctx(_messages(total_chars)) == expected
+
+
+def test_log_prompt_eval_reports_duration(caplog):
+    response = SimpleNamespace(prompt_eval_count=120, prompt_eval_duration=2_500_000)
+    with caplog.at_level("INFO", logger="codekoala"):
+        _log_prompt_eval(response, 4096)
+    assert "120 tokens in 2.5 ms (num_ctx=4096)" in caplog.text
+
+
+def test_log_prompt_eval_skips_missing_duration(caplog):
+    with caplog.at_level("INFO", logger="codekoala"):
+        _log_prompt_eval(SimpleNamespace(message=None), 4096)
+        _log_prompt_eval(SimpleNamespace(prompt_eval_count=None, prompt_eval_duration=None), 4096)
+    assert caplog.text == ""
+
+
+def test_review_prompt_places_previous_content_before_diffs():
+    changes = [
+        FileChange("a.py", "M", "+a-diff", old_content="a-old"),
+        FileChange("b.py", "M", "+b-diff", old_content="b-old"),
+    ]
+    prompt = _prepare_llm_review_prompt(changes)
+    assert prompt.index("a-old") < prompt.index("b-old") < prompt.index("+a-diff") < prompt.index("+b-diff")
+
+
+def test_review_prompt_truncates_previous_content_not_diffs():
+    changes = [
+        FileChange("a.py", "M", "+" + "a" * 7999, old_content="o" * 4200),
+        FileChange("b.py", "M", "+" + "b" * 7999, old_content="p" * 4200),
+    ]
+    prompt = _prepare_llm_review_prompt(changes)
+    assert "+" + "a" * 7999 in prompt
+    assert "+" + "b" * 7999 in prompt
+    assert "from review diffs" not in prompt
+    assert len(prompt) <= MAX_REVIEW_PROMPT_CHARS + 200